@@ -1,4 +1,9 @@
+import argparse
+import numpy as np
+import os
 import sys
+import time
+from collections import deque
 
 
 def count_increasing_sums(ls, window_size):
@@ -11,6 +16,84 @@ def count_increasing_sums(ls, window_size):
     return num_increasing_sums
 
 
+def read_measurements(stream):
+    """Lazily parse one measurement per line from the given stream."""
+    for line in stream:
+        if line.strip():
+            yield int(line)
+
+
+def iter_increasing_sums(measurements, window_sizes):
+    """
+    Generate running counts of increasing window sums, one count per window size.
+
+    Two adjacent windows of size w share all but one reading, so the later sum is
+    larger exactly when the newest reading is larger than the one w readings back.
+    Only the last max(window_sizes) readings are ever kept in memory.
+    """
+    window_sizes = tuple(window_sizes)
+    counts = [0] * len(window_sizes)
+    ring_buffer = deque(maxlen=max(window_sizes))
+    for measurement in measurements:
+        for index, window_size in enumerate(window_sizes):
+            if len(ring_buffer) >= window_size and ring_buffer[-window_size] < measurement:
+                counts[index] += 1
+        ring_buffer.append(measurement)
+        yield tuple(counts)
+
+
+def stream_increasing_sums(measurements, window_sizes):
+    """Count increasing window sums for every window size in a single pass."""
+    window_sizes = tuple(window_sizes)
+    counts = (0,) * len(window_sizes)
+    for counts in iter_increasing_sums(measurements, window_sizes):
+        pass
+    return dict(zip(window_sizes, counts))
+
+
+def convert_to_binary(stream, path, chunk_size=1 << 20):
+    """Convert text measurements into a flat file of int32 depths, one chunk at a time."""
+    with open(path, "wb") as binary_file:
+        chunk = []
+        for measurement in read_measurements(stream):
+            chunk.append(measurement)
+            if len(chunk) == chunk_size:
+                np.array(chunk, dtype=np.int32).tofile(binary_file)
+                chunk = []
+        np.array(chunk, dtype=np.int32).tofile(binary_file)
+
+
+def load_depths(path):
+    """Memory-map a file written by convert_to_binary."""
+    if os.path.getsize(path) == 0:
+        # np.memmap refuses to map empty files.
+        return np.empty(0, dtype=np.int32)
+    return np.memmap(path, dtype=np.int32, mode="r")
+
+
+def count_increasing_sums_np(depths, window_size):
+    """Vectorized count_increasing_sums: compare each depth with the one window_size back."""
+    if len(depths) <= window_size:
+        return 0
+    return int(np.count_nonzero(depths[window_size:] > depths[:-window_size]))
+
+
+def benchmark(n, window_sizes=(1, 3)):
+    """Time count_increasing_sums against count_increasing_sums_np on n random depths."""
+    depths = np.random.default_rng(0).integers(0, 10000, size=n, dtype=np.int32)
+    depths_list = depths.tolist()
+    for window_size in window_sizes:
+        start_time = time.time()
+        expected = count_increasing_sums(depths_list, window_size)
+        loop_elapsed = time.time() - start_time
+        start_time = time.time()
+        actual = count_increasing_sums_np(depths, window_size)
+        np_elapsed = time.time() - start_time
+        assert expected == actual
+        print(f"window={window_size}: loop {1000 * loop_elapsed:.3f}ms, "
+              f"numpy {1000 * np_elapsed:.3f}ms ({loop_elapsed / max(np_elapsed, 1e-9):.1f}x)")
+
+
 def part1(input_list):
     print(count_increasing_sums(input_list, window_size=1))
 
@@ -19,8 +102,42 @@ def part2(input_list):
     print(count_increasing_sums(input_list, window_size=3))
 
 
-if __name__ == "__main__":
+def main():
+    """Advent of Code day 1."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stream", action="store_true",
+                        help="read stdin line by line instead of loading it all")
+    parser.add_argument("--windows", type=int, nargs="+", default=[1, 3],
+                        help="window sizes to count in streaming, binary and benchmark modes")
+    parser.add_argument("--convert", metavar="PATH",
+                        help="convert stdin into an int32 binary file at PATH and exit")
+    parser.add_argument("--binary", metavar="PATH",
+                        help="memory-map depths from a binary file instead of reading stdin")
+    parser.add_argument("--benchmark", metavar="N", type=int,
+                        help="benchmark the numpy path against count_increasing_sums")
+    args = parser.parse_args()
+    if min(args.windows) < 1:
+        parser.error("window sizes must be at least 1")
+    if args.benchmark:
+        benchmark(args.benchmark, args.windows)
+        return
+    if args.convert:
+        convert_to_binary(sys.stdin, args.convert)
+        return
+    if args.binary:
+        depths = load_depths(args.binary)
+        for window_size in args.windows:
+            print(count_increasing_sums_np(depths, window_size))
+        return
+    if args.stream:
+        counts = stream_increasing_sums(read_measurements(sys.stdin), args.windows)
+        for window_size in args.windows:
+            print(counts[window_size])
+        return
     measurements = [int(line) for line in sys.stdin.readlines()]
     part1(measurements)
     part2(measurements)
 
+
+if __name__ == "__main__":
+    main()
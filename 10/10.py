@@ -1,4 +1,9 @@
+import argparse
+import os
+import random
 import sys
+from collections import Counter
+from multiprocessing import Pool
 
 close_open_map = {
     ")": "(",
@@ -21,6 +26,72 @@ autocomplete_score_table = {
     "<": 4,
 }
 
+def build_opcode_table():
+    """
+    Build a 256-entry byte translation table for bracket opcodes.
+
+    Opening brackets map to 1-4 in autocomplete score order, their closing brackets
+    map to 5-8, and every other byte maps to 0.
+    """
+    table = bytearray(256)
+    for open_ch, score in autocomplete_score_table.items():
+        table[ord(open_ch)] = score
+    for close_ch, open_ch in close_open_map.items():
+        table[ord(close_ch)] = autocomplete_score_table[open_ch] + 4
+    return bytes(table)
+
+OPCODE_TABLE = build_opcode_table()
+
+# Syntax error score indexed by closing opcode minus 4.
+OPCODE_ERROR_SCORES = [0] + [
+    syntax_error_score_table[close_ch]
+    for close_ch, _ in sorted(close_open_map.items(), key=lambda item: autocomplete_score_table[item[1]])
+]
+
+def scan_line(opcodes):
+    """
+    Scan one line of opcodes with a bytearray stack.
+
+    Returns the syntax error score and the autocomplete score; at most one is nonzero.
+    """
+    stack = bytearray()
+    for opcode in opcodes:
+        if opcode > 4:
+            if stack and stack[-1] == opcode - 4:
+                stack.pop()
+            else:
+                return OPCODE_ERROR_SCORES[opcode - 4], 0
+        elif opcode:
+            stack.append(opcode)
+    autocomplete_score = 0
+    for opcode in reversed(stack):
+        autocomplete_score = autocomplete_score * 5 + opcode
+    return 0, autocomplete_score
+
+def iter_opcode_lines(data):
+    """Translate raw input bytes to opcodes and generate memoryview slices of each line."""
+    opcodes = memoryview(data.translate(OPCODE_TABLE))
+    start = 0
+    while start < len(data):
+        end = data.find(b"\n", start)
+        if end == -1:
+            end = len(data)
+        if end > start:
+            yield opcodes[start:end]
+        start = end + 1
+
+def compute_scores_bytes(data):
+    """Get the syntax error score and autocomplete scores for raw input bytes."""
+    syntax_error_score = 0
+    autocomplete_scores = []
+    for opcodes in iter_opcode_lines(data):
+        error_score, autocomplete_score = scan_line(opcodes)
+        if error_score:
+            syntax_error_score += error_score
+        else:
+            autocomplete_scores.append(autocomplete_score)
+    return syntax_error_score, autocomplete_scores
+
 def find_first_error(line):
     """
     Find the first character causing a syntax error.
@@ -54,12 +125,140 @@ def compute_scores(lines):
             autocomplete_scores.append(autocomplete_score)
     return syntax_error_score, autocomplete_scores
 
+def select(values, k):
+    """Find the k-th smallest value (0-indexed) with an iterative quickselect in expected linear time."""
+    while True:
+        pivot = random.choice(values)
+        lower = [value for value in values if value < pivot]
+        if k < len(lower):
+            values = lower
+            continue
+        n_equal = sum(1 for value in values if value == pivot)
+        if k < len(lower) + n_equal:
+            return pivot
+        k -= len(lower) + n_equal
+        values = [value for value in values if value > pivot]
+
+def shard_boundaries(path, n_shards):
+    """Split a file into roughly equal byte ranges that end on line boundaries."""
+    file_size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, "rb") as f:
+        for index in range(1, n_shards):
+            offset = max(file_size * index // n_shards, boundaries[-1])
+            f.seek(offset)
+            f.readline()
+            boundaries.append(min(f.tell(), file_size))
+    boundaries.append(file_size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+def read_shard(path, start, end):
+    """Read bytes [start, end) of a file."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start)
+
+def summarize_shard(path, start, end):
+    """
+    Summarize the lines in a shard of a file.
+
+    Returns the syntax error score and a count of the autocomplete scores by bit length.
+    """
+    syntax_error_score, autocomplete_scores = compute_scores_bytes(read_shard(path, start, end))
+    return syntax_error_score, Counter(score.bit_length() for score in autocomplete_scores)
+
+def bucket_shard(path, start, end, lo, bucket_width, n_buckets, collect):
+    """
+    Histogram the autocomplete scores of a shard that fall in [lo, lo + bucket_width * n_buckets).
+
+    Returns a sparse count per bucket index, or the scores in range if collect is True.
+    """
+    hi = lo + bucket_width * n_buckets
+    _, autocomplete_scores = compute_scores_bytes(read_shard(path, start, end))
+    in_range = [score for score in autocomplete_scores if lo <= score < hi]
+    if collect:
+        return in_range
+    return Counter((score - lo) // bucket_width for score in in_range)
+
+def find_rank(counts, rank):
+    """Find the smallest key whose cumulative count exceeds rank. Returns it and the rank within it."""
+    for key in sorted(counts):
+        if rank < counts[key]:
+            return key, rank
+        rank -= counts[key]
+    raise ValueError("rank out of range")
+
+def compute_scores_parallel(path, processes=None, shard_size=1 << 24, n_buckets=1 << 16, collect_limit=1 << 16):
+    """
+    Get the syntax error score and middle autocomplete score of a file with a process pool.
+
+    The file is split into shards of about shard_size bytes and results are folded as
+    they arrive, so neither the workers nor the parent hold more than a shard's worth of
+    scores. The middle score is found by counting selection. Autocomplete scores grow
+    exponentially with line length, so the first pass counts them by bit length, which
+    pins the middle score to one power-of-two range. Each later pass rescans the shards,
+    histograms that range into n_buckets equal buckets and narrows it to the bucket
+    holding the middle rank, until at most collect_limit scores remain and are selected
+    directly. This usually takes two or three passes.
+    """
+    processes = processes or os.cpu_count()
+    n_shards = max(processes, os.path.getsize(path) // shard_size + 1)
+    shards = shard_boundaries(path, n_shards)
+    syntax_error_score = 0
+    bit_length_counts = Counter()
+    with Pool(processes) as pool:
+        for shard_error_score, shard_bit_length_counts in pool.imap_unordered(
+                _summarize_shard_task, [(path, start, end) for start, end in shards]):
+            syntax_error_score += shard_error_score
+            bit_length_counts.update(shard_bit_length_counts)
+        n_scores = sum(bit_length_counts.values())
+        if not n_scores:
+            return syntax_error_score, None
+        bit_length, rank = find_rank(bit_length_counts, n_scores // 2)
+        # All scores with this bit length, and the middle score's rank among them.
+        lo = 1 << (bit_length - 1) if bit_length else 0
+        hi = (1 << bit_length) - 1
+        n_in_range = bit_length_counts[bit_length]
+        while lo < hi:
+            bucket_width = -(-(hi - lo + 1) // n_buckets)
+            collect = n_in_range <= collect_limit
+            tasks = [(path, start, end, lo, bucket_width, n_buckets, collect) for start, end in shards]
+            if collect:
+                in_range = []
+                for shard_scores in pool.imap_unordered(_bucket_shard_task, tasks):
+                    in_range.extend(shard_scores)
+                return syntax_error_score, select(in_range, rank)
+            counts = Counter()
+            for shard_counts in pool.imap_unordered(_bucket_shard_task, tasks):
+                counts.update(shard_counts)
+            index, rank = find_rank(counts, rank)
+            lo += index * bucket_width
+            hi = min(hi, lo + bucket_width - 1)
+            n_in_range = counts[index]
+    return syntax_error_score, lo
+
+def _summarize_shard_task(task):
+    return summarize_shard(*task)
+
+def _bucket_shard_task(task):
+    return bucket_shard(*task)
+
 def main():
     """Advent of Code Day 10."""
-    lines = sys.stdin.readlines()
-    syntax_error_score, autocomplete_scores = compute_scores(lines)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--parallel", metavar="PATH",
+                        help="score the lines of PATH using a process pool")
+    parser.add_argument("--processes", type=int, help="number of worker processes")
+    args = parser.parse_args()
+    if args.parallel:
+        syntax_error_score, middle_score = compute_scores_parallel(args.parallel, args.processes)
+    else:
+        syntax_error_score, autocomplete_scores = compute_scores_bytes(sys.stdin.buffer.read())
+        middle_score = None
+        if autocomplete_scores:
+            middle_score = select(autocomplete_scores, len(autocomplete_scores) // 2)
     print(syntax_error_score)
-    autocomplete_scores.sort()
-    print(autocomplete_scores[int(len(autocomplete_scores)/2)])
+    print(middle_score)
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
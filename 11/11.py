@@ -1,3 +1,5 @@
+import argparse
+import hashlib
 import sys
 import time
 from copy import deepcopy
@@ -89,32 +91,177 @@ def step(grid):
     return flash_count
 
 
+# Energy of the padding cells around an OctopusSim grid; never flashes or resets.
+BORDER = 200
+FLASH = 10
+# Byte translation tables raising every octopus by one, and resetting flashed octopuses.
+INCREMENT_TABLE = bytes(v + 1 if v < BORDER else v for v in range(256))
+RESET_TABLE = bytes(0 if FLASH <= v < BORDER else v for v in range(256))
+
+
+class OctopusSim:
+
+    def __init__(self, grid):
+        """
+        Initialize an array-backed octopus simulator from a Grid.
+
+        Energies live in one bytearray padded with BORDER cells, so the eight
+        neighbours of any octopus are fixed index offsets.
+        """
+        self.n_rows = grid.n_rows
+        self.n_cols = grid.n_cols
+        self.width = grid.n_cols + 2
+        self.energies = bytearray([BORDER]) * (self.width * (grid.n_rows + 2))
+        for i, j, value in grid:
+            self.energies[(i + 1) * self.width + j + 1] = value
+        self.neighbor_offsets = [
+            i_delta * self.width + j_delta
+            for i_delta in (-1, 0, 1) for j_delta in (-1, 0, 1) if i_delta or j_delta
+        ]
+
+    def __len__(self):
+        return self.n_rows * self.n_cols
+
+    def to_grid(self):
+        """Convert back to a Grid."""
+        return Grid([
+            list(self.energies[(i + 1) * self.width + 1:(i + 2) * self.width - 1])
+            for i in range(self.n_rows)
+        ])
+
+    def step(self):
+        """
+        Perform one energy change step.
+
+        Flashes spread through a work queue, so the work done after the initial increment
+        is proportional to the number of flashes. Returns the number of flashes.
+        """
+        energies = self.energies.translate(INCREMENT_TABLE)
+        queue = []
+        index = energies.find(FLASH)
+        while index != -1:
+            queue.append(index)
+            index = energies.find(FLASH, index + 1)
+        offsets = self.neighbor_offsets
+        flash_count = 0
+        while queue:
+            index = queue.pop()
+            flash_count += 1
+            for offset in offsets:
+                neighbor = index + offset
+                energy = energies[neighbor]
+                if energy < FLASH:
+                    energies[neighbor] = energy + 1
+                    if energy + 1 == FLASH:
+                        queue.append(neighbor)
+        self.energies = energies.translate(RESET_TABLE) if flash_count else energies
+        return flash_count
+
+
+class SimHistory:
+
+    def __init__(self, sim, max_steps=None, on_step=None):
+        """
+        Step a simulator until its state repeats or max_steps steps have run.
+
+        A digest of the packed energies is recorded after every step, and the first
+        repeated digest gives the start and length of the cycle the grid falls into.
+        Every flash count and the first synchronized step then follow from the
+        recorded prefix of the run. If max_steps is reached first, the history is
+        partial and cycle_start and cycle_length are None. on_step, if given, is
+        called with each step number and the running flash total.
+        """
+        self.n_octopuses = len(sim)
+        self.flash_prefix = [0]
+        self.first_sync_step = None
+        self.cycle_start = self.cycle_length = None
+        seen = {self._digest(sim.energies): 0}
+        step_number = 0
+        while max_steps is None or step_number < max_steps:
+            step_number += 1
+            flash_count = sim.step()
+            self.flash_prefix.append(self.flash_prefix[-1] + flash_count)
+            if on_step:
+                on_step(step_number, self.flash_prefix[-1])
+            if flash_count == self.n_octopuses and self.first_sync_step is None:
+                self.first_sync_step = step_number
+            digest = self._digest(sim.energies)
+            if digest in seen:
+                self.cycle_start = seen[digest]
+                self.cycle_length = step_number - self.cycle_start
+                return
+            seen[digest] = step_number
+
+    @property
+    def num_steps(self):
+        """Number of steps actually simulated."""
+        return len(self.flash_prefix) - 1
+
+    @staticmethod
+    def _digest(energies):
+        return hashlib.blake2b(energies, digest_size=16).digest()
+
+    def flashes_after(self, num_steps):
+        """Get the total number of flashes after num_steps steps."""
+        if num_steps < len(self.flash_prefix):
+            return self.flash_prefix[num_steps]
+        if self.cycle_length is None:
+            raise ValueError(f"No cycle found within {self.num_steps} steps")
+        num_cycles, remainder = divmod(num_steps - self.cycle_start, self.cycle_length)
+        start_flashes = self.flash_prefix[self.cycle_start]
+        cycle_flashes = self.flash_prefix[self.cycle_start + self.cycle_length] - start_flashes
+        remainder_flashes = self.flash_prefix[self.cycle_start + remainder] - start_flashes
+        return start_flashes + num_cycles * cycle_flashes + remainder_flashes
+
+
 def part1(grid):
     """Part 1 of day 11."""
-    grid = grid.copy()
-    flash_count = 0
-    for _ in range(100):
-        flash_count += step(grid)
-    return flash_count
+    return SimHistory(OctopusSim(grid), max_steps=100).flashes_after(100)
+
 
+def part2(grid, max_steps=None):
+    """
+    Part 2 of day 11.
 
-def part2(grid):
-    """Part 2 of day 11."""
-    grid = grid.copy()
-    step_number = 0
-    while True:
-        step_number += 1
-        if step(grid) == len(grid):
-            return step_number
+    Returns None if the grid never synchronizes, or has not within max_steps steps.
+    """
+    return SimHistory(OctopusSim(grid), max_steps).first_sync_step
 
 
 def main():
     """Advent of Code day 11."""
-    lines = [[int(n) for n in line[:-1]] for line in sys.stdin.readlines()]
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, nargs="+",
+                        help="extra step counts to report total flashes for")
+    parser.add_argument("--max-steps", type=int,
+                        help="give up looking for a cycle or synchronization after this many steps "
+                             "(default: run until the state repeats)")
+    args = parser.parse_args()
+    if args.max_steps is not None and args.max_steps < 100:
+        parser.error("--max-steps must be at least 100 to answer part 1")
+    lines = [[int(n) for n in line.rstrip()] for line in sys.stdin.readlines() if line.strip()]
     start_time = time.time()
     grid = Grid(lines)
-    print(part1(grid))
-    print(part2(grid))
+
+    def report_part1(step_number, flash_total):
+        if step_number == 100:
+            print(flash_total, flush=True)
+
+    history = SimHistory(OctopusSim(grid), args.max_steps, report_part1)
+    if history.num_steps < 100:
+        # The cycle closed before step 100.
+        print(history.flashes_after(100))
+    if history.first_sync_step is not None:
+        print(history.first_sync_step)
+    elif history.cycle_length is not None:
+        print(f"Never synchronizes (cycle length {history.cycle_length})")
+    else:
+        print(f"No cycle or sync within {history.num_steps} steps")
+    for num_steps in args.steps or []:
+        try:
+            print(history.flashes_after(num_steps))
+        except ValueError as error:
+            print(error)
     print(f"Elapsed (no IO): {1000 * (time.time() - start_time)}ms")
 
 
@@ -1,5 +1,12 @@
+import argparse
+import os
+import random
 import sys
 from collections import defaultdict
+from multiprocessing import Pool
+
+# Byte separating paths in an exported path file; cave ids must stay below it.
+PATH_SEPARATOR = 255
 
 def is_small_cave(cave):
     """Returns true if this cave is a small cave."""
@@ -38,10 +45,246 @@ def _count_paths(cave_graph, path, visited_small_caves, allow_double_visit):
         path.pop()
     return num_paths
 
+def contract_graph(cave_graph):
+    """
+    Contract the big caves out of a cave graph.
+
+    Small caves are interned to integer ids, and each small cave maps to a list of
+    (neighbor id, weight) pairs, where weight counts the direct edges plus the big
+    caves that connect the two. A big cave between a cave and itself becomes a
+    self-loop. Returns the ids and the weighted adjacency lists.
+    """
+    small_caves = sorted(cave for cave in cave_graph if is_small_cave(cave))
+    ids = {cave: index for index, cave in enumerate(small_caves)}
+    weights = [defaultdict(int) for _ in small_caves]
+    for cave in small_caves:
+        for neighbor in cave_graph[cave]:
+            if is_small_cave(neighbor):
+                weights[ids[cave]][ids[neighbor]] += 1
+                continue
+            for via_neighbor in cave_graph[neighbor]:
+                if not is_small_cave(via_neighbor):
+                    raise ValueError(f"Adjacent big caves {neighbor} and {via_neighbor} allow infinite paths")
+                weights[ids[cave]][ids[via_neighbor]] += 1
+    return ids, [list(weight.items()) for weight in weights]
+
+def count_paths_memo(cave_graph, allow_double_visit=False):
+    """
+    Count the number of possible paths in the cave without listing them.
+
+    Visited small caves are a bitmask over the interned ids, and path counts are
+    memoized on (cave, visited mask, double visit available).
+    """
+    ids, weights = contract_graph(cave_graph)
+    if "start" not in ids or "end" not in ids:
+        return 0
+    start, end = ids["start"], ids["end"]
+    table = {}
+
+    def _count(cave, visited, double_visit):
+        if cave == end:
+            return 1
+        key = (cave, visited, double_visit)
+        if key in table:
+            return table[key]
+        num_paths = 0
+        for next_cave, weight in weights[cave]:
+            if next_cave == start:
+                continue
+            if visited >> next_cave & 1:
+                if double_visit:
+                    num_paths += weight * _count(next_cave, visited, False)
+            else:
+                num_paths += weight * _count(next_cave, visited | 1 << next_cave, double_visit)
+        table[key] = num_paths
+        return num_paths
+
+    return _count(start, 1 << start, allow_double_visit)
+
+class PathSpace:
+
+    def __init__(self, cave_graph, allow_double_visit=False):
+        """
+        Initialize the space of paths through a cave graph.
+
+        Caves are interned to integer ids and visited small caves are a bitmask.
+        Completion counts are memoized per (cave, visited mask, double visit available)
+        so paths can be enumerated, split up or sampled without recursion over paths.
+        """
+        for cave, neighbors in cave_graph.items():
+            if is_small_cave(cave):
+                continue
+            for neighbor in neighbors:
+                if not is_small_cave(neighbor):
+                    raise ValueError(f"Adjacent big caves {cave} and {neighbor} allow infinite paths")
+        self.names = sorted(cave_graph)
+        self.ids = {cave: index for index, cave in enumerate(self.names)}
+        self.adjacency = [[self.ids[neighbor] for neighbor in cave_graph[cave]] for cave in self.names]
+        self.small_bits = [1 << index if is_small_cave(cave) else 0 for index, cave in enumerate(self.names)]
+        self.start = self.ids.get("start")
+        self.end = self.ids.get("end")
+        self.allow_double_visit = allow_double_visit
+        self.table = {}
+
+    def initial_state(self):
+        """The (cave, visited mask, double visit available) state at the start cave."""
+        return self.start, self.small_bits[self.start], self.allow_double_visit
+
+    def transitions(self, state):
+        """Get the states reachable in one move from the given state."""
+        cave, visited, double_visit = state
+        if cave == self.end:
+            return []
+        next_states = []
+        for next_cave in self.adjacency[cave]:
+            next_double_visit = double_visit
+            if visited & self.small_bits[next_cave]:
+                if not double_visit or next_cave == self.start:
+                    continue
+                next_double_visit = False
+            next_states.append((next_cave, visited | self.small_bits[next_cave], next_double_visit))
+        return next_states
+
+    def count(self, state=None):
+        """Count the paths from the given state (by default the start) to the end."""
+        if self.start is None or self.end is None:
+            return 0
+        state = state or self.initial_state()
+        if state in self.table:
+            return self.table[state]
+        # Fill the table bottom-up with an explicit stack.
+        stack = [state]
+        while stack:
+            current = stack[-1]
+            if current in self.table:
+                stack.pop()
+                continue
+            if current[0] == self.end:
+                self.table[current] = 1
+                stack.pop()
+                continue
+            next_states = self.transitions(current)
+            missing = [next_state for next_state in next_states if next_state not in self.table]
+            if missing:
+                stack.extend(missing)
+            else:
+                self.table[current] = sum(self.table[next_state] for next_state in next_states)
+                stack.pop()
+        return self.table[state]
+
+    def iter_paths(self, first_hop=None):
+        """
+        Generate every path as a tuple of cave ids using an explicit stack.
+
+        If first_hop is given, only paths leaving the start through the first_hop-th
+        entry of its adjacency list are generated.
+        """
+        if self.start is None or self.end is None:
+            return
+        state = self.initial_state()
+        next_states = self.transitions(state)
+        if first_hop is not None:
+            next_states = [state for state in next_states if state[0] == self.adjacency[self.start][first_hop]][:1]
+        path = [self.start]
+        stack = [iter(next_states)]
+        while stack:
+            next_state = next(stack[-1], None)
+            if next_state is None:
+                stack.pop()
+                path.pop()
+                continue
+            path.append(next_state[0])
+            if next_state[0] == self.end:
+                yield tuple(path)
+                path.pop()
+            else:
+                stack.append(iter(self.transitions(next_state)))
+
+    def sample(self, k, rng=random):
+        """
+        Sample k paths uniformly at random, with replacement.
+
+        Each move is chosen with probability proportional to the number of paths
+        completing from the next state, so no paths are listed.
+        """
+        samples = []
+        for _ in range(k):
+            state = self.initial_state()
+            choice = rng.randrange(self.count(state))
+            path = [state[0]]
+            while state[0] != self.end:
+                for next_state in self.transitions(state):
+                    next_count = self.count(next_state)
+                    if choice < next_count:
+                        break
+                    choice -= next_count
+                state = next_state
+                path.append(state[0])
+            samples.append(tuple(path))
+        return samples
+
+    def path_names(self, path):
+        """Convert a path of cave ids back to cave names."""
+        return [self.names[cave] for cave in path]
+
+
+def _export_subtree(cave_graph, allow_double_visit, first_hop, output_path):
+    """Write every path through the given first hop to output_path. Returns the path count."""
+    path_space = PathSpace(cave_graph, allow_double_visit)
+    num_paths = 0
+    with open(output_path, "wb") as f:
+        f.write(",".join(path_space.names).encode() + b"\n")
+        for path in path_space.iter_paths(first_hop):
+            f.write(bytes(path) + bytes([PATH_SEPARATOR]))
+            num_paths += 1
+    return num_paths
+
+def export_paths(cave_graph, output_prefix, allow_double_visit=False, processes=None):
+    """
+    Export every path to compact files, one per first hop out of the start cave.
+
+    Each file holds a line of comma-separated cave names followed by the paths as
+    cave id bytes, each terminated by PATH_SEPARATOR. The first-hop subtrees are
+    enumerated in a process pool. Returns a list of (file path, path count) pairs.
+    """
+    if len(cave_graph) >= PATH_SEPARATOR:
+        raise ValueError(f"Too many caves to encode: {len(cave_graph)}")
+    cave_graph = dict(cave_graph)
+    tasks = [
+        (cave_graph, allow_double_visit, first_hop, f"{output_prefix}.{first_hop}.paths")
+        for first_hop in range(len(cave_graph.get("start", [])))
+    ]
+    with Pool(processes or os.cpu_count()) as pool:
+        counts = pool.starmap(_export_subtree, tasks)
+    return [(task[-1], num_paths) for task, num_paths in zip(tasks, counts)]
+
+def read_paths(path_file):
+    """Generate the paths in a file written by export_paths as lists of cave names."""
+    with open(path_file, "rb") as f:
+        names = f.readline().rstrip(b"\n").decode().split(",")
+        data = f.read()
+    for encoded_path in data.split(bytes([PATH_SEPARATOR]))[:-1]:
+        yield [names[cave] for cave in encoded_path]
+
 def main():
     """Advent of Code Day 12."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--export", metavar="PREFIX",
+                        help="export every part 2 path to PREFIX.<first hop>.paths files")
+    parser.add_argument("--sample", type=int, metavar="K",
+                        help="print K part 2 paths sampled uniformly at random")
+    parser.add_argument("--processes", type=int, help="number of worker processes for --export")
+    args = parser.parse_args()
     graph = build_graph(sys.stdin.readlines())
-    print(count_paths(graph))
-    print(count_paths(graph, allow_double_visit=True))
+    print(count_paths_memo(graph))
+    print(count_paths_memo(graph, allow_double_visit=True))
+    if args.export:
+        for output_path, num_paths in export_paths(graph, args.export, True, args.processes):
+            print(f"{output_path}: {num_paths} paths")
+    if args.sample:
+        path_space = PathSpace(graph, allow_double_visit=True)
+        for path in path_space.sample(args.sample):
+            print(",".join(path_space.path_names(path)))
 
-main()
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import numpy as np
 import sys
 
 
@@ -93,15 +94,64 @@ def grid_string(grid):
     return "".join(row_strings)
 
 
+def fold_coordinate_values(values, fold_indices):
+    """
+    Apply a sequence of folds along one axis to an array of coordinate values.
+
+    Values on a fold line, or reflected below zero, vanish just as they do in the dense
+    grid; they are returned as -1.
+    """
+    for fold_index in fold_indices:
+        values = np.where(values > fold_index, 2 * fold_index - values, values)
+        values = np.where(values == fold_index, -1, values)
+    return values
+
+
+def compose_folds(values, fold_indices):
+    """
+    Map coordinate values through a whole fold sequence in one pass.
+
+    The folds are composed over the distinct values only, then looked up for every dot.
+    """
+    distinct_values, inverse = np.unique(values, return_inverse=True)
+    return fold_coordinate_values(distinct_values, fold_indices)[inverse]
+
+
+def fold_dots(coordinates, folds):
+    """
+    Fold a sparse set of dots.
+
+    Returns the deduplicated x and y arrays of the remaining dots, and the width and
+    height of the folded paper.
+    """
+    coordinates = np.array(coordinates, dtype=np.int64).reshape(-1, 2)
+    xs, ys = coordinates[:, 0], coordinates[:, 1]
+    width = int(xs.max(initial=-1)) + 1
+    height = int(ys.max(initial=-1)) + 1
+    x_folds = [fold_index for axis, fold_index in folds if axis == "x"]
+    y_folds = [fold_index for axis, fold_index in folds if axis == "y"]
+    width = min([width] + x_folds)
+    height = min([height] + y_folds)
+    xs, ys = compose_folds(xs, x_folds), compose_folds(ys, y_folds)
+    visible = (xs >= 0) & (ys >= 0)
+    keys = np.unique(ys[visible] * max(width, 1) + xs[visible])
+    return keys % max(width, 1), keys // max(width, 1), width, height
+
+
+def dots_to_grid(xs, ys, width, height):
+    """Build a dense grid from dot coordinates, for rendering."""
+    grid = [[0 for _ in range(width)] for _ in range(height)]
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        grid[y][x] = 1
+    return grid
+
+
 def main():
     """Advent of Code Day 13."""
     coordinates, folds = parse_input(sys.stdin.readlines())
-    grid = build_grid(coordinates)
-    grid = perform_fold(grid, folds[0])
-    print(count_visible_dots(grid))
-    for fold in folds[1:]:
-        grid = perform_fold(grid, fold)
-    print(grid_string(grid))
+    xs, _, _, _ = fold_dots(coordinates, folds[:1])
+    print(len(xs))
+    print(grid_string(dots_to_grid(*fold_dots(coordinates, folds))))
 
 
 main()
\ No newline at end of file
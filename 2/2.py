@@ -1,4 +1,16 @@
+import argparse
+import numpy as np
+import os
 import sys
+from functools import reduce
+from multiprocessing import Pool
+
+# Command opcodes.
+FORWARD = 0
+UP = 1
+DOWN = 2
+
+OPCODES = {"forward": FORWARD, "up": UP, "down": DOWN}
 
 
 def parse_commands(command_strings):
@@ -8,6 +20,39 @@ def parse_commands(command_strings):
         yield direction, int(value)
 
 
+def encode_commands(command_strings):
+    """Encode a list of command strings as parallel opcode and value arrays."""
+    opcodes = []
+    values = []
+    for string in command_strings:
+        direction, value = string.split()
+        opcodes.append(OPCODES[direction])
+        values.append(int(value))
+    return np.array(opcodes, dtype=np.int8), np.array(values, dtype=np.int64)
+
+
+def trajectory(opcodes, values):
+    """
+    Get the horizontal position, depth and aim after every step for part 2.
+
+    The aim at each step is a prefix sum of the up/down values, and the depth
+    is a prefix sum of aim times the forward values. The part 1 depth is the aim.
+    """
+    forward = np.where(opcodes == FORWARD, values, 0)
+    aim = np.cumsum(np.where(opcodes == DOWN, values, 0) - np.where(opcodes == UP, values, 0))
+    horizontal = np.cumsum(forward)
+    depth = np.cumsum(aim * forward)
+    return horizontal, depth, aim
+
+
+def follow_commands_np(opcodes, values):
+    """Follow encoded commands for both parts, returning two (horizontal, depth) pairs."""
+    if len(opcodes) == 0:
+        return (0, 0), (0, 0)
+    horizontal, depth, aim = trajectory(opcodes, values)
+    return (int(horizontal[-1]), int(aim[-1])), (int(horizontal[-1]), int(depth[-1]))
+
+
 def follow_commands_1(commands):
     """Follow commands for part 1."""
     horizontal, depth = 0, 0
@@ -35,6 +80,71 @@ def follow_commands_2(commands):
     return horizontal, depth
 
 
+def combine_states(left, right):
+    """
+    Combine two (horizontal, depth, aim) states from adjacent chunks.
+
+    The right chunk was followed starting from zero aim, so every one of its forward
+    moves also gains the left chunk's aim.
+    """
+    left_horizontal, left_depth, left_aim = left
+    right_horizontal, right_depth, right_aim = right
+    return (
+        left_horizontal + right_horizontal,
+        left_depth + right_depth + left_aim * right_horizontal,
+        left_aim + right_aim,
+    )
+
+
+def chunk_boundaries(path, n_chunks):
+    """Split a file into roughly equal byte ranges that end on line boundaries."""
+    file_size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, "rb") as f:
+        for index in range(1, n_chunks):
+            offset = max(file_size * index // n_chunks, boundaries[-1])
+            f.seek(offset)
+            f.readline()
+            boundaries.append(min(f.tell(), file_size))
+    boundaries.append(file_size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+
+def follow_chunk(path, start, end):
+    """Follow the commands in bytes [start, end) of a file from a zero state."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    horizontal, depth, aim = 0, 0, 0
+    for line in data.split(b"\n"):
+        if not line:
+            continue
+        # The first byte is enough to tell forward, up and down apart.
+        direction = line[0]
+        value = int(line[line.index(b" ") + 1:])
+        if direction == 102:  # f
+            horizontal += value
+            depth += aim * value
+        elif direction == 117:  # u
+            aim -= value
+        elif direction == 100:  # d
+            aim += value
+    return horizontal, depth, aim
+
+
+def follow_commands_parallel(path, processes=None):
+    """
+    Follow the commands in a file by reducing byte ranges in a process pool.
+
+    Returns the final (horizontal, depth, aim) state; the part 1 depth is the aim.
+    """
+    processes = processes or os.cpu_count()
+    ranges = chunk_boundaries(path, processes * 4)
+    with Pool(processes) as pool:
+        states = pool.starmap(follow_chunk, [(path, start, end) for start, end in ranges])
+    return reduce(combine_states, states, (0, 0, 0))
+
+
 def part1(commands):
     horizontal, depth = follow_commands_1(commands)
     print(horizontal * depth)
@@ -45,7 +155,29 @@ def part2(commands):
     print(horizontal * depth)
 
 
-if __name__ == "__main__":
+def main():
+    """Advent of Code day 2."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--parallel", metavar="PATH",
+                        help="follow the commands in PATH using a process pool")
+    parser.add_argument("--processes", type=int, help="number of worker processes")
+    parser.add_argument("--numpy", action="store_true",
+                        help="encode commands as arrays and evaluate them with prefix sums")
+    args = parser.parse_args()
+    if args.parallel:
+        horizontal, depth, aim = follow_commands_parallel(args.parallel, args.processes)
+        print(horizontal * aim)
+        print(horizontal * depth)
+        return
+    if args.numpy:
+        part1_position, part2_position = follow_commands_np(*encode_commands(sys.stdin.readlines()))
+        print(part1_position[0] * part1_position[1])
+        print(part2_position[0] * part2_position[1])
+        return
     commands = list(parse_commands(sys.stdin.readlines()))
     part1(commands)
-    part2(commands)
\ No newline at end of file
+    part2(commands)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,4 +1,6 @@
+import numpy as np
 import sys
+from bisect import bisect_left
 
 
 def most_and_least_common_bits(bstrings):
@@ -69,6 +71,52 @@ def co2_bit_criteria(indices_with_zero, indices_with_one):
     return indices_with_one
 
 
+def oxygen_bit(n_zeroes, n_ones):
+    """Count-based bit criteria for the oxygen generator rating."""
+    return 1 if n_ones >= n_zeroes else 0
+
+
+def co2_bit(n_zeroes, n_ones):
+    """Count-based bit criteria for the CO2 scrubber rating."""
+    return 0 if n_zeroes <= n_ones else 1
+
+
+class ReportIndex:
+
+    def __init__(self, bstrings):
+        """
+        Index a diagnostic report for rating queries.
+
+        The report is stored as a sorted array of integers, which acts as an implicit
+        counted binary trie: the strings sharing a prefix form a contiguous range, and
+        one bisect splits a range into its 0 and 1 children.
+        """
+        self.width = len(bstrings[0])
+        self.values = sorted(int(bstring, 2) for bstring in bstrings)
+
+    def rating(self, bit_criteria):
+        """
+        Find the rating selected by bit_criteria.
+
+        bit_criteria is called with the zero and one counts at each bit position and
+        returns the bit to keep. An empty side is never chosen.
+        """
+        lo, hi = 0, len(self.values)
+        prefix = 0
+        for bit_index in range(self.width - 1, -1, -1):
+            if hi - lo == 1:
+                break
+            one_prefix = prefix | (1 << bit_index)
+            split = bisect_left(self.values, one_prefix, lo, hi)
+            n_zeroes, n_ones = split - lo, hi - split
+            if n_zeroes == 0 or (n_ones > 0 and bit_criteria(n_zeroes, n_ones) == 1):
+                lo = split
+                prefix = one_prefix
+            else:
+                hi = split
+        return self.values[lo]
+
+
 def bstring_to_int(bstring):
     """
     Convert binary string to an integer.
@@ -76,26 +124,66 @@ def bstring_to_int(bstring):
     The binary string may be either a list of 0 and 1 integers or a string.
     """
     value = 0
-    for index, bit in enumerate(reversed(bstring)):
+    for bit in bstring:
+        value <<= 1
         if bit == 1 or bit == '1':
-            value += 2 ** index
+            value |= 1
     return value
 
 
+def pack_bstrings(bstrings):
+    """
+    Pack binary strings of equal width into a NumPy array.
+
+    Widths up to 64 are packed into one uint64 per string, wider strings become
+    an (n, width) uint8 bit matrix.
+    """
+    width = len(bstrings[0])
+    if width <= 64:
+        return np.array([int(bstring, 2) for bstring in bstrings], dtype=np.uint64), width
+    data = np.frombuffer("".join(bstrings).encode("ascii"), dtype=np.uint8)
+    return (data - ord("0")).reshape(len(bstrings), width), width
+
+
+def column_ones_counts(packed, width, block_rows=1 << 16):
+    """
+    Count the ones in each bit column of packed binary strings, most significant first.
+
+    All columns are extracted at once with a broadcast shift, a block of rows at a time
+    to bound the size of the temporary bit matrix.
+    """
+    if packed.ndim == 2:
+        return packed.sum(axis=0, dtype=np.int64)
+    shifts = np.arange(width - 1, -1, -1, dtype=np.uint64)
+    counts = np.zeros(width, dtype=np.int64)
+    for block_start in range(0, len(packed), block_rows):
+        block = packed[block_start:block_start+block_rows]
+        counts += ((block[:, None] >> shifts) & np.uint64(1)).sum(axis=0, dtype=np.int64)
+    return counts
+
+
+def gamma_and_epsilon(packed, width):
+    """Compute the gamma and epsilon rates from packed binary strings."""
+    ones_counts = column_ones_counts(packed, width)
+    zeroes_counts = len(packed) - ones_counts
+    if np.any(ones_counts == zeroes_counts):
+        raise ValueError("bit counts equal")
+    gamma = bstring_to_int((ones_counts > zeroes_counts).tolist())
+    epsilon = gamma ^ ((1 << width) - 1)
+    return gamma, epsilon
+
+
 def part1(bstrings):
     """Part 1 of AOC2021 day 3."""
-    most_common_bits, least_common_bits = most_and_least_common_bits(bstrings)
-    gamma = bstring_to_int(most_common_bits)
-    epsilon = bstring_to_int(least_common_bits)
+    gamma, epsilon = gamma_and_epsilon(*pack_bstrings(bstrings))
     print(gamma * epsilon)
 
 
 def part2(bstrings):
     """Part 2 of AOC2021 day 3."""
-    oxygen_bits = filter_bstrings(bstrings, range(len(bstrings)), 0, oxygen_bit_criteria)
-    oxygen_rating = bstring_to_int(oxygen_bits)
-    co2_bits = filter_bstrings(bstrings, range(len(bstrings)), 0, co2_bit_criteria)
-    co2_rating = bstring_to_int(co2_bits)
+    report_index = ReportIndex(bstrings)
+    oxygen_rating = report_index.rating(oxygen_bit)
+    co2_rating = report_index.rating(co2_bit)
     print(oxygen_rating * co2_rating)
 
 
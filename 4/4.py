@@ -1,4 +1,7 @@
+import argparse
+import numpy as np
 import sys
+from collections import defaultdict
 
 
 class BingoBoard:
@@ -47,6 +50,92 @@ class BingoBoard:
         return total
 
 
+class BingoEngine:
+
+    def __init__(self, boards, size=5):
+        """
+        Initialize a bingo engine over many boards.
+
+        Every number is indexed to the cells that contain it, and each board keeps
+        hit counters for its rows and columns, so a draw only touches the boards
+        containing that number and a win is detected when a counter reaches size.
+        """
+        self.size = size
+        self.cell_index = defaultdict(list)
+        self.row_hits = [[0] * size for _ in boards]
+        self.col_hits = [[0] * size for _ in boards]
+        self.unmarked_sums = [0] * len(boards)
+        self.won = [False] * len(boards)
+        self.drawn = set()
+        for board_index, board in enumerate(boards):
+            for row_index, row in enumerate(board):
+                for col_index, val in enumerate(row):
+                    self.cell_index[val].append((board_index, row_index, col_index))
+                    self.unmarked_sums[board_index] += val
+
+    def draw(self, num):
+        """Mark the given number everywhere. Returns the indices of boards that just won."""
+        if num in self.drawn:
+            return []
+        self.drawn.add(num)
+        winners = []
+        for board_index, row_index, col_index in self.cell_index.get(num, ()):
+            self.unmarked_sums[board_index] -= num
+            self.row_hits[board_index][row_index] += 1
+            self.col_hits[board_index][col_index] += 1
+            if self.won[board_index]:
+                continue
+            if (self.row_hits[board_index][row_index] == self.size
+                    or self.col_hits[board_index][col_index] == self.size):
+                self.won[board_index] = True
+                winners.append(board_index)
+        return winners
+
+    def winners(self, drawn_numbers):
+        """Generate (board index, winning number, unmarked sum) for boards in the order they win."""
+        for number in drawn_numbers:
+            for board_index in self.draw(number):
+                yield board_index, number, self.unmarked_sums[board_index]
+
+
+class Tournament:
+
+    def __init__(self, drawn_numbers, boards):
+        """
+        Compute when every board wins without simulating the draws.
+
+        Each cell is mapped to the index of its draw, so a row or column completes
+        at the max of its cells and a board wins at the min over its rows and columns.
+        Boards that never win get a win time of len(drawn_numbers).
+        """
+        self.drawn_numbers = np.array(drawn_numbers, dtype=np.int64)
+        self.boards = np.array(boards, dtype=np.int64)
+        never_drawn = len(drawn_numbers)
+        max_number = max(int(self.boards.max()), int(self.drawn_numbers.max(initial=0)))
+        draw_index = np.full(max_number + 1, never_drawn, dtype=np.int64)
+        # Only the first draw of a repeated number counts.
+        unique_numbers, first_draws = np.unique(self.drawn_numbers, return_index=True)
+        draw_index[unique_numbers] = first_draws
+        self.cell_times = draw_index[self.boards]
+        row_times = self.cell_times.max(axis=2).min(axis=1)
+        col_times = self.cell_times.max(axis=1).min(axis=1)
+        self.win_times = np.minimum(row_times, col_times)
+        order = np.argsort(self.win_times, kind="stable")
+        self.win_order = order[self.win_times[order] < never_drawn]
+
+    def __len__(self):
+        """Number of boards that win at some point."""
+        return len(self.win_order)
+
+    def winner(self, k):
+        """Get (board index, winning number, unmarked sum) of the k-th board to win."""
+        board_index = int(self.win_order[k])
+        win_time = self.win_times[board_index]
+        unmarked = self.cell_times[board_index] > win_time
+        unmarked_sum = int(self.boards[board_index][unmarked].sum())
+        return board_index, int(self.drawn_numbers[win_time]), unmarked_sum
+
+
 def parse_numbers_and_boards(input_lines):
     """Parse puzzle input."""
     numbers = [int(num_string) for num_string in input_lines[0].split(",")]
@@ -58,35 +147,46 @@ def parse_numbers_and_boards(input_lines):
     return numbers, bingo_boards
 
 
-def part1(drawn_numbers, bingo_boards):
+def part1(drawn_numbers, bingo_boards, incremental=False):
     """Part 1 of day 4."""
-    for number in drawn_numbers:
-        for board in bingo_boards:
-            board.mark(number)
-            if board.has_won():
-                print(board.sum_unmarked_numbers() * number)
-                return
+    boards = [board.board for board in bingo_boards]
+    if incremental:
+        for _, number, unmarked_sum in BingoEngine(boards).winners(drawn_numbers):
+            print(unmarked_sum * number)
+            return
+        return
+    tournament = Tournament(drawn_numbers, boards)
+    if len(tournament):
+        _, number, unmarked_sum = tournament.winner(0)
+        print(unmarked_sum * number)
 
 
-def part2(drawn_numbers, bingo_boards):
+def part2(drawn_numbers, bingo_boards, incremental=False):
     """Part 2 of day 4."""
-    for number in drawn_numbers:
-        winning_indices = []
-        for index, board in enumerate(bingo_boards):
-            board.mark(number)
-            if board.has_won():
-                if len(bingo_boards) == 1:
-                    print(board.sum_unmarked_numbers() * number)
-                    return
-                winning_indices.append(index)
-        for index in reversed(winning_indices):
-            del bingo_boards[index]
+    boards = [board.board for board in bingo_boards]
+    if incremental:
+        last_winner = None
+        for last_winner in BingoEngine(boards).winners(drawn_numbers):
+            pass
+        if last_winner:
+            _, number, unmarked_sum = last_winner
+            print(unmarked_sum * number)
+        return
+    tournament = Tournament(drawn_numbers, boards)
+    if len(tournament):
+        _, number, unmarked_sum = tournament.winner(-1)
+        print(unmarked_sum * number)
 
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--incremental", action="store_true",
+                        help="simulate the draws with the indexed BingoEngine instead of "
+                             "computing every win time at once")
+    args = parser.parse_args()
     drawn_numbers, bingo_boards = parse_numbers_and_boards(sys.stdin.readlines())
-    part1(drawn_numbers, bingo_boards)
-    part2(drawn_numbers, bingo_boards)
+    part1(drawn_numbers, bingo_boards, args.incremental)
+    part2(drawn_numbers, bingo_boards, args.incremental)
 
 
 main()
\ No newline at end of file
@@ -1,9 +1,26 @@
+import argparse
+import numpy as np
 import sys
+from bisect import bisect_left, bisect_right, insort
 from collections import defaultdict, namedtuple
+from itertools import combinations, groupby
 
 
 Point = namedtuple("Point", ["x", "y"])
 
+# Unit step taken along a line segment for each orientation.
+ORIENTATION_STEPS = {
+    "north": (0, 1),
+    "east": (1, 0),
+    "northeast": (1, 1),
+    "southeast": (1, -1),
+}
+
+# Largest dense uint16 grid, in cells, to accumulate overlaps in before falling back to sparse counting.
+MAX_DENSE_GRID_CELLS = 1 << 25
+# Points added to the dense grid between clamps, keeping every count below the uint16 limit.
+DENSE_GRID_BATCH = (1 << 16) - 3
+
 
 class LineSegment(namedtuple("LineSegment", ["orientation", "start", "end"])):
     __slots__ = ()
@@ -59,36 +76,218 @@ def parse_line_segment(line_seg_string):
     raise ValueError(f"Uncovered case: {start} {end}")
 
 
-def partn(line_segments, orientations):
-    """Part n of day 5."""
-    points = defaultdict(int)
-    for line_segment in line_segments:
-        if line_segment.orientation not in orientations:
-            continue    
-        for point in line_segment.range():
-            points[point] += 1
+def rasterize(line_segments, orientations):
+    """Get the x and y coordinates of every point on the segments as two NumPy arrays."""
+    segments = [seg for seg in line_segments if seg.orientation in orientations]
+    if not segments:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    start_x = np.array([seg.start.x for seg in segments], dtype=np.int64)
+    start_y = np.array([seg.start.y for seg in segments], dtype=np.int64)
+    end_x = np.array([seg.end.x for seg in segments], dtype=np.int64)
+    end_y = np.array([seg.end.y for seg in segments], dtype=np.int64)
+    step_x = np.array([ORIENTATION_STEPS[seg.orientation][0] for seg in segments], dtype=np.int64)
+    step_y = np.array([ORIENTATION_STEPS[seg.orientation][1] for seg in segments], dtype=np.int64)
+    lengths = np.maximum(np.abs(end_x - start_x), np.abs(end_y - start_y)) + 1
+    # Offset of each point along its own segment.
+    segment_starts = np.cumsum(lengths) - lengths
+    offsets = np.arange(lengths.sum()) - np.repeat(segment_starts, lengths)
+    xs = np.repeat(start_x, lengths) + offsets * np.repeat(step_x, lengths)
+    ys = np.repeat(start_y, lengths) + offsets * np.repeat(step_y, lengths)
+    return xs, ys
+
+
+def count_overlaps(line_segments, orientations, max_dense_cells=MAX_DENSE_GRID_CELLS):
+    """
+    Count the points covered by at least two line segments.
+
+    Points are accumulated into a dense uint16 grid when it fits in max_dense_cells,
+    otherwise the flattened point keys are counted sparsely. Dense counts are clamped
+    to 2 after every batch, so they never overflow.
+    """
+    xs, ys = rasterize(line_segments, orientations)
+    if len(xs) == 0:
+        return 0
+    xs = xs - xs.min()
+    ys = ys - ys.min()
+    width = int(xs.max()) + 1
+    height = int(ys.max()) + 1
+    keys = ys * width + xs
+    if width * height <= max_dense_cells:
+        overlap_counts = np.zeros(width * height, dtype=np.uint16)
+        for batch_start in range(0, len(keys), DENSE_GRID_BATCH):
+            batch_keys = keys[batch_start:batch_start+DENSE_GRID_BATCH]
+            np.add.at(overlap_counts, batch_keys, 1)
+            overlap_counts[batch_keys] = np.minimum(overlap_counts[batch_keys], 2)
+    else:
+        _, overlap_counts = np.unique(keys, return_counts=True)
+    return int(np.count_nonzero(overlap_counts > 1))
+
+
+def line_key(orientation, x, y):
+    """Get the key identifying the line of the given orientation through (x, y)."""
+    if orientation == "north":
+        return x
+    elif orientation == "east":
+        return y
+    elif orientation == "northeast":
+        return y - x
+    elif orientation == "southeast":
+        return y + x
+
+
+def line_param(orientation, x, y):
+    """Get the position of (x, y) along its line of the given orientation."""
+    return y if orientation == "north" else x
+
+
+def line_point(orientation, key, t):
+    """Get the point at position t along the line with the given orientation and key."""
+    if orientation == "north":
+        return key, t
+    elif orientation == "east":
+        return t, key
+    elif orientation == "northeast":
+        return t, t + key
+    elif orientation == "southeast":
+        return t, key - t
+
+
+def merge_coverage(intervals):
+    """
+    Sweep over inclusive intervals on a line.
+
+    Returns the merged intervals covered at least once and at least twice.
+    """
+    events = sorted([(start, 1) for start, _ in intervals] + [(end + 1, -1) for _, end in intervals])
+    covered, doubled = [], []
+    depth = 0
+    covered_start = doubled_start = None
+    for pos, group in groupby(events, key=lambda event: event[0]):
+        new_depth = depth + sum(delta for _, delta in group)
+        if depth < 1 <= new_depth:
+            covered_start = pos
+        elif new_depth < 1 <= depth:
+            covered.append((covered_start, pos - 1))
+        if depth < 2 <= new_depth:
+            doubled_start = pos
+        elif new_depth < 2 <= depth:
+            doubled.append((doubled_start, pos - 1))
+        depth = new_depth
+    return covered, doubled
+
+
+def line_coverage(line_segments, orientations):
+    """Group segments by line and merge each line's intervals with merge_coverage."""
+    lines = defaultdict(lambda: defaultdict(list))
+    for seg in line_segments:
+        if seg.orientation not in orientations:
+            continue
+        key = line_key(seg.orientation, *seg.start)
+        interval = (line_param(seg.orientation, *seg.start), line_param(seg.orientation, *seg.end))
+        lines[seg.orientation][key].append(interval)
+    return {
+        orientation: {key: merge_coverage(intervals) for key, intervals in keyed_intervals.items()}
+        for orientation, keyed_intervals in lines.items()
+    }
+
+
+def crossing_points(coverage, orientation_a, orientation_b):
+    """
+    Find the points covered by both a line of orientation_a and one of orientation_b.
+
+    In (u, v) = (key of the b line, key of the a line) coordinates, a lines are
+    horizontal intervals and b lines are vertical intervals, so a sweep over u
+    with a sorted set of active a keys reports each crossing once.
+    """
+    # Diagonals only cross where y - x and y + x have the same parity.
+    check_parity = {orientation_a, orientation_b} == {"northeast", "southeast"}
+    events = []
+    for key_a, (covered, _) in coverage[orientation_a].items():
+        for t_start, t_end in covered:
+            u_start = line_key(orientation_b, *line_point(orientation_a, key_a, t_start))
+            u_end = line_key(orientation_b, *line_point(orientation_a, key_a, t_end))
+            events.append((min(u_start, u_end), 0, key_a))
+            events.append((max(u_start, u_end), 2, key_a))
+    for key_b, (covered, _) in coverage[orientation_b].items():
+        for t_start, t_end in covered:
+            v_start = line_key(orientation_a, *line_point(orientation_b, key_b, t_start))
+            v_end = line_key(orientation_a, *line_point(orientation_b, key_b, t_end))
+            events.append((key_b, 1, (min(v_start, v_end), max(v_start, v_end))))
+    events.sort(key=lambda event: event[:2])
+    active_keys = []
+    for u, event_type, payload in events:
+        if event_type == 0:
+            insort(active_keys, payload)
+        elif event_type == 2:
+            del active_keys[bisect_left(active_keys, payload)]
+        else:
+            v_min, v_max = payload
+            for key_a in active_keys[bisect_left(active_keys, v_min):bisect_right(active_keys, v_max)]:
+                if check_parity and (key_a - u) % 2:
+                    continue
+                # key_b varies linearly along the a line, so solve for its position.
+                u_at_zero = line_key(orientation_b, *line_point(orientation_a, key_a, 0))
+                slope = line_key(orientation_b, *line_point(orientation_a, key_a, 1)) - u_at_zero
+                yield line_point(orientation_a, key_a, (u - u_at_zero) // slope)
+
+
+def count_overlaps_sweep(line_segments, orientations):
+    """
+    Count the points covered by at least two line segments from their geometry alone.
+
+    Collinear overlaps come from a sweep along each line. Crossings between lines of
+    different orientations come from crossing_points. A crossing that also lies in
+    m collinear overlaps has already been counted m times, so it adds 1 - m.
+    """
+    coverage = line_coverage(line_segments, orientations)
     num_overlaps = 0
-    for point, overlap_count in points.items():
-        if overlap_count > 1:
-            num_overlaps += 1
-    print(num_overlaps)
+    doubled_starts = {}
+    for orientation, lines in coverage.items():
+        for key, (_, doubled) in lines.items():
+            num_overlaps += sum(end - start + 1 for start, end in doubled)
+            doubled_starts[orientation, key] = [start for start, _ in doubled]
+    crossings = set()
+    for orientation_a, orientation_b in combinations(sorted(coverage), 2):
+        crossings.update(crossing_points(coverage, orientation_a, orientation_b))
+    for x, y in crossings:
+        num_doubled = 0
+        for orientation, lines in coverage.items():
+            key = line_key(orientation, x, y)
+            if key not in lines:
+                continue
+            t = line_param(orientation, x, y)
+            index = bisect_right(doubled_starts[orientation, key], t) - 1
+            if index >= 0 and t <= lines[key][1][index][1]:
+                num_doubled += 1
+        num_overlaps += 1 - num_doubled
+    return num_overlaps
+
+
+def partn(line_segments, orientations, overlap_counter=count_overlaps):
+    """Part n of day 5."""
+    print(overlap_counter(line_segments, orientations))
 
 
-def part1(line_segments):
+def part1(line_segments, overlap_counter=count_overlaps):
     """Part 1 of day 5."""
-    partn(line_segments, {"north", "east"})
+    partn(line_segments, {"north", "east"}, overlap_counter)
 
 
-def part2(line_segments):
+def part2(line_segments, overlap_counter=count_overlaps):
     """Part 2 of day 5."""
-    partn(line_segments, {"north", "east", "northeast", "southeast"})
+    partn(line_segments, {"north", "east", "northeast", "southeast"}, overlap_counter)
 
 
 def main():
     """Day 5 of Advent of Code."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sweep", action="store_true",
+                        help="count overlaps from segment geometry instead of rasterizing")
+    args = parser.parse_args()
+    overlap_counter = count_overlaps_sweep if args.sweep else count_overlaps
     line_segments = [parse_line_segment(line) for line in sys.stdin.readlines()]
-    part1(line_segments)
-    part2(line_segments)
+    part1(line_segments, overlap_counter)
+    part2(line_segments, overlap_counter)
 
 
 main()
\ No newline at end of file
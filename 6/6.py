@@ -1,5 +1,9 @@
+import argparse
+import json
+import os
 import sys
 import time
+from collections import Counter
 
 
 class FishPopTable:
@@ -35,16 +39,182 @@ class FishPopTable:
             total_pop += self.get(internal_timer, num_days)
         return total_pop
 
+    def extend(self, max_days):
+        """Fill the table iteratively up to max_days, growing it if needed."""
+        if max_days + 1 > len(self.pop_counts):
+            self.pop_counts.extend(None for _ in range(max_days + 1 - len(self.pop_counts)))
+        for day in range(1, max_days + 1):
+            if self.pop_counts[day]:
+                continue
+            mature_day = day - self.days_until_mature
+            reproduce_day = day - self.reproduction_time
+            self.pop_counts[day] = (
+                (self.pop_counts[mature_day] if mature_day >= 0 else 1)
+                + (self.pop_counts[reproduce_day] if reproduce_day >= 0 else 1)
+            )
+
+    def population_counts(self, initial_internal_timers, day_horizons):
+        """
+        Get the population count of a school of fish after each of the given numbers of days.
+
+        The school is collapsed into a histogram of internal timers, and the table is
+        filled once up to the largest horizon.
+        """
+        day_horizons = list(day_horizons)
+        timer_counts = Counter(initial_internal_timers)
+        self.extend(max(day_horizons, default=0))
+        return [
+            sum(count * self.get(internal_timer, num_days) for internal_timer, count in timer_counts.items())
+            for num_days in day_horizons
+        ]
+
+    def save(self, path):
+        """
+        Save the filled part of the table along with its configuration.
+
+        Counts are stored as hex strings, which have no digit limit, and the file is
+        written to a temporary path first so a failed save never leaves a partial table.
+        """
+        filled = 0
+        while filled + 1 < len(self.pop_counts) and self.pop_counts[filled + 1]:
+            filled += 1
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump({
+                    "days_until_mature": self.days_until_mature,
+                    "reproduction_time": self.reproduction_time,
+                    "pop_counts": [format(count, "x") for count in self.pop_counts[:filled + 1]],
+                }, f)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def load(path, days_until_mature, reproduction_time, max_days):
+        """Load a table saved by FishPopTable.save, checking that its configuration matches."""
+        with open(path) as f:
+            saved = json.load(f)
+        if (saved["days_until_mature"], saved["reproduction_time"]) != (days_until_mature, reproduction_time):
+            raise ValueError("saved table has a different configuration")
+        table = FishPopTable(days_until_mature, reproduction_time, max_days)
+        pop_counts = [int(count, 16) for count in saved["pop_counts"][:max_days + 1]]
+        table.pop_counts[:len(pop_counts)] = pop_counts
+        return table
+
+
+class FishPopMatrix:
+
+    def __init__(self, days_until_mature, reproduction_time, modulus=None):
+        """
+        Initialize a fish population engine based on a timer-bucket transition matrix.
+
+        Populations are counted per internal timer value, and one day is a linear map
+        on those counts, so n days is the n-th power of the map.
+        """
+        self.days_until_mature = days_until_mature
+        self.reproduction_time = reproduction_time
+        self.modulus = modulus
+        self.n_buckets = max(days_until_mature, reproduction_time)
+        self.transition = [[0] * self.n_buckets for _ in range(self.n_buckets)]
+        for timer in range(1, self.n_buckets):
+            self.transition[timer-1][timer] = 1
+        # Fish at timer 0 reset, and each spawns a new fish.
+        self.transition[reproduction_time-1][0] += 1
+        self.transition[days_until_mature-1][0] += 1
+        self._powers = [self.transition]
+
+    def _reduce(self, value):
+        return value % self.modulus if self.modulus else value
+
+    def _mat_mult(self, a, b):
+        """Multiply two square matrices."""
+        b_cols = list(zip(*b))
+        return [[self._reduce(sum(x * y for x, y in zip(row, col))) for col in b_cols] for row in a]
+
+    def _mat_vec_mult(self, a, v):
+        """Multiply a square matrix by a vector."""
+        return [self._reduce(sum(x * y for x, y in zip(row, v))) for row in a]
+
+    def bucket_counts(self, initial_bucket_counts, num_days):
+        """Get the population count per timer value after num_days, by repeated squaring."""
+        counts = list(initial_bucket_counts)
+        bit = 0
+        while num_days >> bit:
+            if bit == len(self._powers):
+                self._powers.append(self._mat_mult(self._powers[-1], self._powers[-1]))
+            if (num_days >> bit) & 1:
+                counts = self._mat_vec_mult(self._powers[bit], counts)
+            bit += 1
+        return counts
+
+    def population_count(self, initial_internal_timers, num_days):
+        """
+        Get the population count of a school of fish with the given internal timers
+        after the given number of days have passed.
+
+        A fish whose timer is past the last bucket just waits until it reaches that
+        bucket, as in FishPopTable.get.
+        """
+        last_bucket = self.n_buckets - 1
+        initial_bucket_counts = [0] * self.n_buckets
+        total_pop = 0
+        for internal_timer, count in Counter(initial_internal_timers).items():
+            if internal_timer < 0:
+                raise ValueError(f"Negative internal timer: {internal_timer}")
+            if internal_timer <= last_bucket:
+                initial_bucket_counts[internal_timer] += count
+                continue
+            delayed_counts = [0] * self.n_buckets
+            delayed_counts[last_bucket] = count
+            remaining_days = max(num_days - (internal_timer - last_bucket), 0)
+            total_pop += sum(self.bucket_counts(delayed_counts, remaining_days))
+        total_pop += sum(self.bucket_counts(initial_bucket_counts, num_days))
+        return self._reduce(total_pop)
+
 
 def main():
     """Day 6 of Advent of Code."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matrix", action="store_true",
+                        help="use transition-matrix exponentiation")
+    parser.add_argument("--days", type=int, nargs="+",
+                        help="extra day counts to report after parts 1 and 2")
+    parser.add_argument("--modulus", type=int,
+                        help="report populations modulo this value (requires --matrix)")
+    parser.add_argument("--table", metavar="PATH",
+                        help="load the population table from PATH if it exists and save it back")
+    args = parser.parse_args()
+    if args.modulus is not None and not args.matrix:
+        parser.error("--modulus requires --matrix")
     input_internal_timers = [int(n) for n in sys.stdin.read().split(",")]
+    # Parts 1 and 2, then any extra horizons.
+    day_horizons = [80, 256] + (args.days or [])
     start_time = time.time()
-    fish_pop_table = FishPopTable(9, 7, 256)
-    # Part 1.
-    print(fish_pop_table.population_count(input_internal_timers, 80))
-    # Part 2.
-    print(fish_pop_table.population_count(input_internal_timers, 256))
+    if args.matrix:
+        fish_pop_matrix = FishPopMatrix(9, 7, args.modulus)
+        populations = [fish_pop_matrix.population_count(input_internal_timers, num_days)
+                       for num_days in day_horizons]
+    else:
+        max_days = max(day_horizons)
+        fish_pop_table = None
+        if args.table and os.path.exists(args.table):
+            try:
+                fish_pop_table = FishPopTable.load(args.table, 9, 7, max_days)
+            except (OSError, ValueError, KeyError, TypeError):
+                # An unreadable or mismatched table is just a cache miss.
+                fish_pop_table = None
+        if fish_pop_table is None:
+            fish_pop_table = FishPopTable(9, 7, max_days)
+        populations = fish_pop_table.population_counts(input_internal_timers, day_horizons)
+        if args.table:
+            fish_pop_table.save(args.table)
+    if hasattr(sys, "set_int_max_str_digits"):
+        # Exact populations for huge day counts can have millions of digits.
+        sys.set_int_max_str_digits(0)
+    for population in populations:
+        print(population)
     print(f"\nElapsed time (no IO): {(time.time() - start_time) * 1000:.3f}ms")
 
 
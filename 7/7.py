@@ -1,4 +1,8 @@
+import argparse
+import numpy as np
 import sys
+from bisect import bisect_right
+from itertools import accumulate
 import time
 
 
@@ -34,13 +38,109 @@ def triangle_number_table(n):
     return table
 
 
+class CrabAligner:
+
+    def __init__(self, input_positions):
+        """
+        Initialize a crab alignment solver.
+
+        The positions are sorted once with prefix sums of positions and squared
+        positions, so the linear and triangular costs of any candidate are
+        scored with one bisect.
+        """
+        self.positions = sorted(input_positions)
+        self.n = len(self.positions)
+        self.prefix_sums = [0] + list(accumulate(self.positions))
+        self.prefix_square_sums = [0] + list(accumulate(pos * pos for pos in self.positions))
+
+    def linear_cost(self, x):
+        """Sum of |x - pos| over all crabs."""
+        k = bisect_right(self.positions, x)
+        left_sum = self.prefix_sums[k]
+        right_sum = self.prefix_sums[-1] - left_sum
+        return x * k - left_sum + right_sum - x * (self.n - k)
+
+    def triangular_cost(self, x):
+        """Sum of the triangle numbers of |x - pos| over all crabs."""
+        squared_distances = (self.n * x * x - 2 * x * self.prefix_sums[-1]
+                             + self.prefix_square_sums[-1])
+        return (squared_distances + self.linear_cost(x)) // 2
+
+    def linear_candidates(self):
+        """The linear cost is minimized at the median."""
+        return [self.positions[(self.n - 1) // 2]]
+
+    def triangular_candidates(self):
+        """The triangular cost is minimized within half a step of the mean."""
+        mean_floor = self.prefix_sums[-1] // self.n
+        return [x for x in range(mean_floor - 1, mean_floor + 3)
+                if self.positions[0] <= x <= self.positions[-1]]
+
+    def minimize(self, cost_func, candidates=None):
+        """
+        Find the best (position, cost) for a convex cost function.
+
+        If no candidates are given, binary search on the sign of cost_func(x + 1) - cost_func(x).
+        """
+        if candidates is None:
+            lb, ub = self.positions[0], self.positions[-1]
+            while lb < ub:
+                mid = (lb + ub) // 2
+                if cost_func(mid + 1) < cost_func(mid):
+                    lb = mid + 1
+                else:
+                    ub = mid
+            candidates = [lb]
+        return min(((x, cost_func(x)) for x in candidates), key=lambda pair: (pair[1], pair[0]))
+
+    def best_linear(self):
+        """Best (position, cost) for the part 1 fuel model."""
+        return self.minimize(self.linear_cost, self.linear_candidates())
+
+    def best_triangular(self):
+        """Best (position, cost) for the part 2 fuel model."""
+        return self.minimize(self.triangular_cost, self.triangular_candidates())
+
+
+def fuel_cost_curve(input_positions, fuel_model="linear", dtype=np.int64):
+    """
+    Get the fuel cost of aligning at every position from 0 to max(input_positions).
+
+    Crabs are collapsed into a histogram, and the cumulative crab counts and position sums
+    to the left of each position give the linear cost. The triangular cost adds the sum of
+    squared distances, which follows from the totals, and halves.
+    """
+    counts = np.bincount(np.asarray(input_positions, dtype=np.int64)).astype(np.int64)
+    xs = np.arange(len(counts), dtype=np.int64)
+    n, total = counts.sum(), (counts * xs).sum()
+    left_counts = np.cumsum(counts)
+    left_sums = np.cumsum(counts * xs)
+    costs = xs * left_counts - left_sums + (total - left_sums) - xs * (n - left_counts)
+    if fuel_model == "triangular":
+        square_total = (counts * xs * xs).sum()
+        costs = (n * xs * xs - 2 * xs * total + square_total + costs) // 2
+    elif fuel_model != "linear":
+        raise ValueError(f"Unknown fuel model: {fuel_model}")
+    return costs.astype(dtype)
+
+
 def main():
     """Advent of Code day 7."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--curve", metavar="PATH",
+                        help="write the fuel cost of every position to a .npy file")
+    parser.add_argument("--model", choices=["linear", "triangular"], default="linear",
+                        help="fuel model for --curve")
+    parser.add_argument("--dtype", choices=["int64", "float32"], default="int64",
+                        help="output dtype for --curve")
+    args = parser.parse_args()
     input_positions = [int(n) for n in sys.stdin.read().split(",")]
     start_time = time.time()
-    print(minimize_fuel(input_positions, lambda x, pos: abs(x - pos)))
-    triangle_numbers = triangle_number_table(max(input_positions))
-    print(minimize_fuel(input_positions, lambda x, pos: triangle_numbers[abs(x - pos)]))
+    crab_aligner = CrabAligner(input_positions)
+    print(crab_aligner.best_linear()[1])
+    print(crab_aligner.best_triangular()[1])
+    if args.curve:
+        np.save(args.curve, fuel_cost_curve(input_positions, args.model, np.dtype(args.dtype)))
     print(f"Elapsed (no IO): {1000 * (time.time() - start_time):.3f}ms")
 
 
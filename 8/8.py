@@ -1,5 +1,14 @@
+import argparse
+import os
 import sys
 import time
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+
+# Segments lit for each digit on a correctly wired display.
+CANONICAL_DIGITS = ["abcefg", "cf", "acdeg", "acdfg", "bcdf", "abdfg", "abdefg", "acf", "abcdefg", "abcdfg"]
+SEGMENTS = "abcdefg"
 
 
 def parse_lines(lines):
@@ -70,6 +79,37 @@ def pattern_decoder(patterns):
     return {segments: digit for digit, segments in encoder.items()}
 
 
+def build_frequency_code_table():
+    """
+    Build a table from frequency code to digit.
+
+    Each segment lights up in a fixed number of the ten digits no matter how the wires
+    are crossed, and summing those counts over a digit's segments gives a different code
+    for each digit.
+    """
+    segment_frequencies = {segment: "".join(CANONICAL_DIGITS).count(segment) for segment in SEGMENTS}
+    table = {}
+    for digit, segments in enumerate(CANONICAL_DIGITS):
+        table[sum(segment_frequencies[segment] for segment in segments)] = digit
+    if len(table) != len(CANONICAL_DIGITS):
+        raise ValueError("frequency codes are not unique")
+    return table
+
+
+FREQUENCY_CODE_TABLE = build_frequency_code_table()
+
+
+def decode_line(patterns, output_digits):
+    """Decode the output value of one display using per-segment frequency codes."""
+    all_patterns = "".join(patterns)
+    segment_frequencies = {segment: all_patterns.count(segment) for segment in SEGMENTS}
+    value = 0
+    for output_digit in output_digits:
+        code = sum(segment_frequencies[segment] for segment in output_digit)
+        value = value * 10 + FREQUENCY_CODE_TABLE[code]
+    return value
+
+
 def convert_digits_to_int(digits):
     """Convert a list of digits into a single integer."""
     return int("".join([str(digit) for digit in digits]))
@@ -86,13 +126,91 @@ def decode_output_values(lines):
     return decoded_outputs
 
 
+def read_chunks(stream, chunk_size):
+    """Generate lists of at most chunk_size lines from the stream."""
+    while True:
+        chunk = list(islice(stream, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def process_chunk(raw_lines):
+    """
+    Parse and decode a chunk of display lines.
+
+    Returns the 1/4/7/8 count, the sum of output values, and the parse and decode times.
+    """
+    start_time = time.time()
+    lines = parse_lines(line for line in raw_lines if line.strip())
+    parse_time = time.time()
+    count = count_1_4_7_8(lines)
+    output_sum = sum(decode_line(patterns, output_digits) for patterns, output_digits in lines)
+    decode_time = time.time()
+    return count, output_sum, parse_time - start_time, decode_time - parse_time
+
+
+def decode_log(stream, chunk_size=10000, processes=None):
+    """
+    Decode a display log in chunks across a process pool.
+
+    At most two chunks per worker are in flight, so memory is bounded by the chunk size.
+    Returns the 1/4/7/8 count, the sum of output values, and the total worker time spent
+    in the parse and decode stages along with the time spent merging results.
+    """
+    processes = processes or os.cpu_count()
+    count, output_sum = 0, 0
+    timings = {"parse": 0.0, "decode": 0.0, "merge": 0.0}
+    pending = deque()
+
+    def merge(result):
+        nonlocal count, output_sum
+        chunk_count, chunk_sum, parse_elapsed, decode_elapsed = result.get()
+        start_time = time.time()
+        count += chunk_count
+        output_sum += chunk_sum
+        timings["parse"] += parse_elapsed
+        timings["decode"] += decode_elapsed
+        timings["merge"] += time.time() - start_time
+
+    with Pool(processes) as pool:
+        for chunk in read_chunks(stream, chunk_size):
+            if len(pending) >= 2 * processes:
+                merge(pending.popleft())
+            pending.append(pool.apply_async(process_chunk, (chunk,)))
+        while pending:
+            merge(pending.popleft())
+    return count, output_sum, timings
+
+
 def main():
     """Advent of Code day 8."""
-    lines = parse_lines(sys.stdin.readlines())
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--parallel", action="store_true",
+                        help="stream stdin in chunks through a process pool")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="lines per chunk")
+    parser.add_argument("--processes", type=int, help="number of worker processes")
+    args = parser.parse_args()
+    if args.parallel:
+        start_time = time.time()
+        count, output_sum, timings = decode_log(sys.stdin, args.chunk_size, args.processes)
+        print(count)
+        print(output_sum)
+        print(f"Elapsed (with IO): {1000 * (time.time() - start_time):.3f}ms")
+        for stage, elapsed in timings.items():
+            print(f"  {stage} (summed over chunks): {1000 * elapsed:.3f}ms")
+        return
+    raw_lines = sys.stdin.readlines()
     start_time = time.time()
+    lines = parse_lines(raw_lines)
+    parse_time = time.time()
     print(count_1_4_7_8(lines))
-    print(sum(decode_output_values(lines)))
-    print(f"Elapsed (no IO): {1000 * (time.time() - start_time):.3f}ms")
+    print(sum(decode_line(patterns, output_digits) for patterns, output_digits in lines))
+    decode_time = time.time()
+    print(f"Elapsed (no IO): {1000 * (decode_time - start_time):.3f}ms")
+    print(f"  parse: {1000 * (parse_time - start_time):.3f}ms")
+    print(f"  decode: {1000 * (decode_time - parse_time):.3f}ms")
 
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
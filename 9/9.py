@@ -1,4 +1,7 @@
+import heapq
+import numpy as np
 import sys
+from array import array
 
 def parse_height_map(input_lines):
     """Parse a height map from the given input lines."""
@@ -72,11 +75,96 @@ def three_largest_basins_product(height_map):
     basins = sorted(get_basins(height_map), key=len, reverse=True)
     return len(basins[0]) * len(basins[1]) * len(basins[2])
 
+def pack_height_map(input_lines):
+    """
+    Pack the input lines into a flat bytearray of heights with a border of 9s.
+
+    Returns the buffer and its padded width and height.
+    """
+    rows = [line.rstrip("\n").encode("ascii") for line in input_lines if line.strip()]
+    width = len(rows[0]) + 2
+    wall_row = b"9" * width
+    packed = bytearray(wall_row)
+    for row in rows:
+        packed += b"9" + row + b"9"
+    packed += wall_row
+    # Convert ASCII digits into heights.
+    packed = bytearray(packed.translate(bytes.maketrans(b"0123456789", bytes(range(10)))))
+    return packed, width, len(rows) + 2
+
+def label_basins(packed, width, n_rows):
+    """
+    Label every basin in a packed height map with an iterative flood fill.
+
+    Returns a label per cell of the unpadded map (0 for height 9) and the size of
+    each basin, where basin sizes[label - 1] has the given label.
+    """
+    labels = array("i", [0]) * len(packed)
+    sizes = []
+    offsets = (1, -1, width, -width)
+    for start in range(width, len(packed) - width):
+        if packed[start] == 9 or labels[start]:
+            continue
+        label = len(sizes) + 1
+        labels[start] = label
+        stack = [start]
+        size = 0
+        while stack:
+            index = stack.pop()
+            size += 1
+            for offset in offsets:
+                neighbor = index + offset
+                if packed[neighbor] != 9 and not labels[neighbor]:
+                    labels[neighbor] = label
+                    stack.append(neighbor)
+        sizes.append(size)
+    unpadded_labels = array("i")
+    for row_start in range(width, (n_rows - 1) * width, width):
+        unpadded_labels.extend(labels[row_start+1:row_start+width-1])
+    return unpadded_labels, sizes
+
+def largest_basins_product(sizes, k=3):
+    """Get the product of the sizes of the k largest basins."""
+    product = 1
+    for size in heapq.nlargest(k, sizes):
+        product *= size
+    return product
+
+def height_array(data):
+    """
+    Build a uint8 height array padded with 10s from raw input bytes.
+
+    data may be a bytes object or a uint8 array such as a np.memmap of the input file.
+    """
+    data = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray)) else data
+    is_newline = data == ord("\n")
+    content = np.flatnonzero(~is_newline)
+    if len(content) == 0:
+        raise ValueError("empty height map")
+    # Drop trailing newlines, then terminate the last row with exactly one.
+    data = np.append(data[:content[-1] + 1], np.uint8(ord("\n")))
+    newlines = np.flatnonzero(is_newline[:content[-1] + 1])
+    width = int(newlines[0]) if len(newlines) else int(content[-1]) + 1
+    heights = data.reshape(-1, width + 1)[:, :width] - np.uint8(ord("0"))
+    return np.pad(heights, 1, constant_values=10)
+
+def low_point_mask(heights):
+    """Mark the low points of a padded height array with four shifted comparisons."""
+    center = heights[1:-1, 1:-1]
+    return ((center < heights[:-2, 1:-1]) & (center < heights[2:, 1:-1])
+            & (center < heights[1:-1, :-2]) & (center < heights[1:-1, 2:]))
+
+def low_point_risk_level_sum_np(heights):
+    """Compute the sum of the risk levels of the low points of a padded height array."""
+    low_heights = heights[1:-1, 1:-1][low_point_mask(heights)]
+    return int(low_heights.sum(dtype=np.int64)) + len(low_heights)
+
 def main():
     """Day 9 of Advent of Code."""
-    height_map = parse_height_map(sys.stdin.readlines())
-    height_map = pad_height_map(height_map)
-    print(low_point_risk_level_sum(height_map))
-    print(three_largest_basins_product(height_map))
+    data = sys.stdin.buffer.read()
+    print(low_point_risk_level_sum_np(height_array(data)))
+    input_lines = data.decode("ascii").splitlines(keepends=True)
+    _, basin_sizes = label_basins(*pack_height_map(input_lines))
+    print(largest_basins_product(basin_sizes))
   
 main()
\ No newline at end of file